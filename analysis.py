@@ -0,0 +1,177 @@
+import math
+import numpy
+from constraint import Constraint, ConstraintType
+from dataclasses import dataclass, field
+from link import Link
+from type_aliases import Point
+from typing import Callable, Optional
+
+# step of the central differences used for the numeric jacobian
+STEP = 1e-6
+# singular values below this fraction of the largest one are treated as zero
+TOLERANCE = 1e-7
+
+def cross(a: numpy.array, b: numpy.array) -> float:
+    return a[0] * b[1] - a[1] * b[0]
+
+def residuals(constraint: Constraint, position: Callable[[Point], numpy.array]) -> list[float]:
+    def direction(link: Link) -> numpy.array:
+        return position(link.b) - position(link.a)
+    directions = [direction(link) for link in constraint.links]
+    lengths = [numpy.linalg.norm(direction) for direction in directions]
+    match constraint.type:
+        case ConstraintType.DISTANCE:
+            a, b = constraint.points
+            return [numpy.linalg.norm(position(b) - position(a)) - constraint.value]
+        case ConstraintType.POINT_ON_LINE:
+            (point,), (link,) = constraint.points, constraint.links
+            return [cross(directions[0], position(point) - position(link.a)) / lengths[0]]
+        case ConstraintType.EQUAL:
+            return [lengths[0] - lengths[1]]
+        case ConstraintType.RATIO:
+            return [lengths[0] - constraint.value * lengths[1]]
+        case ConstraintType.HORIZONTAL:
+            return [directions[0][1]]
+        case ConstraintType.VERTICAL:
+            return [directions[0][0]]
+        case ConstraintType.ANGLE:
+            u, v = directions
+            radians = math.radians(constraint.value)
+            return [(cross(u, v) * math.cos(radians) - numpy.dot(u, v) * math.sin(radians)) / (lengths[0] * lengths[1])]
+        case ConstraintType.PARALLEL:
+            u, v = directions
+            return [cross(u, v) / (lengths[0] * lengths[1])]
+        case ConstraintType.DRAGGED:
+            (point,) = constraint.points
+            return list(position(point))
+
+def jacobian(
+    constraints: list[Constraint], points: list[Point],
+    coords: Callable[[Point], numpy.array]
+) -> tuple[numpy.array, list[Constraint]]:
+    # one row per equation, two columns (x and y) per point,
+    # also returns the constraint each row belongs to
+    columns = {id(point): 2 * index for index, point in enumerate(points)}
+    current = {id(point): coords(point) for point in points}
+    rows = []
+    row_constraints = []
+    for constraint in constraints:
+        involved = constraint.involved_points()
+        block = numpy.zeros((constraint.equation_count(), 2 * len(points)))
+        for point in involved:
+            for axis in range(2):
+                offset = numpy.zeros(2)
+                offset[axis] = STEP
+                def shifted(sign: float) -> list[float]:
+                    def position(other: Point) -> numpy.array:
+                        if other is point:
+                            return current[id(other)] + sign * offset
+                        return current[id(other)]
+                    return residuals(constraint, position)
+                derivative = (numpy.array(shifted(1)) - numpy.array(shifted(-1))) / (2 * STEP)
+                block[:, columns[id(point)] + axis] = derivative
+        rows.extend(block)
+        row_constraints.extend([constraint] * constraint.equation_count())
+    return numpy.array(rows).reshape(-1, 2 * len(points)), row_constraints
+
+def rank(matrix: numpy.array) -> int:
+    if matrix.size == 0:
+        return 0
+    singular_values = numpy.linalg.svd(matrix, compute_uv = False)
+    return int(numpy.sum(singular_values > TOLERANCE * singular_values[0]))
+
+def redundant_rows(matrix: numpy.array) -> list[int]:
+    # rows that are linear combinations of the rows before them (incremental Gram-Schmidt)
+    basis = numpy.zeros((0, matrix.shape[1]))
+    redundant = []
+    for index, row in enumerate(matrix):
+        norm = numpy.linalg.norm(row)
+        remainder = row
+        for _ in range(2):
+            remainder = remainder - basis.T @ (basis @ remainder)
+        remainder_norm = numpy.linalg.norm(remainder)
+        if norm == 0 or remainder_norm < math.sqrt(TOLERANCE) * norm:
+            redundant.append(index)
+            continue
+        basis = numpy.vstack([basis, remainder / remainder_norm])
+    return redundant
+
+def movable_points(matrix: numpy.array, points: list[Point]) -> list[Point]:
+    # points with a component in the null space of the jacobian can move without violating any constraint
+    if matrix.size == 0:
+        return points[:]
+    _, singular_values, right = numpy.linalg.svd(matrix)
+    matrix_rank = int(numpy.sum(singular_values > TOLERANCE * singular_values[0]))
+    null_space = right[matrix_rank:]
+    return [
+        point for index, point in enumerate(points)
+        if numpy.linalg.norm(null_space[:, 2 * index : 2 * index + 2]) > math.sqrt(TOLERANCE)
+    ]
+
+@dataclass
+class AnalysisReport:
+    # degrees of freedom left while all pinned joints are held in place
+    dof: int
+    # degrees of freedom when the driving joint is released onto its circle, None without a driver
+    mobility: Optional[int]
+    redundant: list[Constraint] = field(default_factory = list)
+    underconstrained: list[Point] = field(default_factory = list)
+    # whether holding the pinned joints holds the pen in place, True without a pen
+    pen_determined: bool = True
+    # index of every point, to refer to joints in the summary
+    point_indices: dict[int, int] = field(default_factory = dict)
+
+    def is_hopeless(self) -> bool:
+        # an undetermined pen can't trace the curve and an immobile linkage can't trace anything,
+        # other free joints don't keep the pen from tracing
+        return not self.pen_determined or self.mobility == 0
+
+    def redundant_gadgets(self) -> dict[str, int]:
+        gadgets = {}
+        for constraint in self.redundant:
+            gadget = constraint.gadget or "(no gadget)"
+            gadgets[gadget] = gadgets.get(gadget, 0) + 1
+        return gadgets
+
+    def summary(self) -> str:
+        lines = [f"degrees of freedom: {self.dof}"]
+        if self.mobility is not None:
+            lines.append(f"mobility with released driver: {self.mobility}")
+        if not self.pen_determined:
+            lines.append("the pen isn't determined by the input")
+        lines.append(f"redundant constraints: {len(self.redundant)}")
+        for gadget, count in self.redundant_gadgets().items():
+            lines.append(f"  {count} in {gadget}")
+        if self.underconstrained:
+            joints = ", ".join(str(self.point_indices[id(point)]) for point in self.underconstrained)
+            lines.append(f"under-constrained joints: {joints}")
+        return "\n".join(lines)
+
+def analyze(
+    points: list[Point], constraints: list[Constraint],
+    coords: Callable[[Point], numpy.array],
+    driver: Optional[Point] = None, around: Optional[Point] = None, pen: Optional[Point] = None
+) -> AnalysisReport:
+    matrix, row_constraints = jacobian(constraints, points, coords)
+    redundant = []
+    for index in redundant_rows(matrix):
+        if not any(row_constraints[index] is constraint for constraint in redundant):
+            redundant.append(row_constraints[index])
+    underconstrained = movable_points(matrix, points)
+    mobility = None
+    if driver is not None:
+        def is_driver_pin(constraint: Constraint) -> bool:
+            return constraint.type == ConstraintType.DRAGGED and constraint.points[0] is driver
+        driver_radius = numpy.linalg.norm(coords(driver) - coords(around))
+        released = [constraint for constraint in constraints if not is_driver_pin(constraint)]
+        released.append(Constraint(ConstraintType.DISTANCE, points = [around, driver], value = driver_radius))
+        released_matrix, _ = jacobian(released, points, coords)
+        mobility = 2 * len(points) - rank(released_matrix)
+    return AnalysisReport(
+        dof = 2 * len(points) - rank(matrix),
+        mobility = mobility,
+        redundant = redundant,
+        underconstrained = underconstrained,
+        pen_determined = not any(point is pen for point in underconstrained),
+        point_indices = {id(point): index for index, point in enumerate(points)},
+    )
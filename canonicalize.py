@@ -0,0 +1,41 @@
+from constraint import Constraint, ConstraintType
+from dataclasses import dataclass
+from link import Link
+from type_aliases import Point
+
+@dataclass
+class Canonicalization:
+    constraints: list[Constraint]
+    before: int = 0
+    rewritten: int = 0
+
+    def summary(self) -> str:
+        # every rewrite replaces one constraint by one distance, nothing is removed
+        return f"canonicalization rewrote {self.rewritten} of {self.before} constraints to distances, one for one"
+
+def point_pair(a: Point, b: Point) -> tuple[int, int]:
+    return tuple(sorted([id(a), id(b)]))
+
+def canonicalize(constraints: list[Constraint]) -> Canonicalization:
+    pinned = {id(point) for constraint in constraints if constraint.type == ConstraintType.DRAGGED for point in constraint.points}
+    # links whose length is enforced, by a distance or by pinning both ends
+    fixed = {point_pair(*constraint.points) for constraint in constraints if constraint.type == ConstraintType.DISTANCE}
+    def is_fixed(link: Link) -> bool:
+        return point_pair(link.a, link.b) in fixed or (id(link.a) in pinned and id(link.b) in pinned)
+
+    result = Canonicalization([], before = len(constraints))
+    for constraint in constraints:
+        relational = constraint.type in [ConstraintType.EQUAL, ConstraintType.RATIO]
+        if relational and all(link.has_length() for link in constraint.links):
+            unfixed = [link for link in constraint.links if not is_fixed(link)]
+            # with both lengths unenforced so far, the relation itself may be what enforces them
+            if len(unfixed) == 1:
+                (link,) = unfixed
+                result.constraints.append(
+                    Constraint(ConstraintType.DISTANCE, points = [link.a, link.b], value = link.length, gadget = constraint.gadget)
+                )
+                fixed.add(point_pair(link.a, link.b))
+                result.rewritten += 1
+                continue
+        result.constraints.append(constraint)
+    return result
@@ -0,0 +1,60 @@
+from constraint import Constraint, ConstraintType
+from link import Link
+from python_solvespace import SolverSystem
+from type_aliases import Line, Point, Workplane
+
+class Cluster:
+    # points solved for in this cluster
+    points: list[Point]
+    # pinned points, held in place while solving this cluster
+    boundary: list[Point]
+    constraints: list[Constraint]
+    solver_system: SolverSystem
+    workplane: Workplane
+    local_points: dict[int, Point]
+    local_lines: dict[int, Line]
+
+    def __init__(self, points: list[Point], constraints: list[Constraint]) -> None:
+        self.points = points
+        self.constraints = constraints
+        own_ids = {id(point) for point in points}
+        self.boundary = []
+        for constraint in constraints:
+            for point in constraint.involved_points():
+                if id(point) not in own_ids:
+                    own_ids.add(id(point))
+                    self.boundary.append(point)
+        self.solver_system = SolverSystem()
+        self.workplane = self.solver_system.create_2d_base()
+        self.local_points = {}
+        self.local_lines = {}
+        for point in [*self.points, *self.boundary]:
+            self.local_points[id(point)] = self.solver_system.add_point_2d(0, 0, self.workplane)
+        for point in self.boundary:
+            self.solver_system.dragged(self.local_point(point), self.workplane)
+        for constraint in constraints:
+            constraint.add_to(self.solver_system, self.workplane, self.local_point, self.local_line)
+
+    def local_point(self, point: Point) -> Point:
+        return self.local_points[id(point)]
+
+    def local_line(self, link: Link) -> Line:
+        if id(link) not in self.local_lines:
+            a, b = self.local_point(link.a), self.local_point(link.b)
+            self.local_lines[id(link)] = self.solver_system.add_line_2d(a, b, self.workplane)
+        return self.local_lines[id(link)]
+
+    def solve(self, source: SolverSystem) -> int:
+        for point in [*self.points, *self.boundary]:
+            self.solver_system.set_params(self.local_point(point).params, source.params(point.params))
+        result = self.solver_system.solve()
+        # write back regardless of the result: the redundant braces make
+        # solvespace report an inconsistency even when every constraint is satisfied
+        for point in self.points:
+            source.set_params(point.params, self.solver_system.params(self.local_point(point).params))
+        return result
+
+def single_cluster(points: list[Point], constraints: list[Constraint]) -> Cluster:
+    pinned = {id(point) for constraint in constraints if constraint.type == ConstraintType.DRAGGED for point in constraint.points}
+    free_points = [point for point in points if id(point) not in pinned]
+    return Cluster(free_points, [constraint for constraint in constraints if constraint.type != ConstraintType.DRAGGED])
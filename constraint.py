@@ -0,0 +1,64 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from link import Link
+from python_solvespace import SolverSystem
+from type_aliases import Line, Point, Workplane
+from typing import Callable, Optional
+
+# the values are the constraint types used by the .slvs file format
+class ConstraintType(Enum):
+    DISTANCE = 30
+    POINT_ON_LINE = 42
+    EQUAL = 50
+    RATIO = 51
+    HORIZONTAL = 80
+    VERTICAL = 81
+    ANGLE = 120
+    PARALLEL = 121
+    DRAGGED = 200
+
+@dataclass(eq = False)
+class Constraint:
+    type: ConstraintType
+    points: list[Point] = field(default_factory = list)
+    links: list[Link] = field(default_factory = list)
+    value: Optional[float] = None
+    # the gadgets the constraint was added by, outermost first
+    gadget: Optional[str] = None
+
+    def involved_points(self) -> list[Point]:
+        points = []
+        for point in [*self.points, *[point for link in self.links for point in [link.a, link.b]]]:
+            if not any(point is other for other in points):
+                points.append(point)
+        return points
+
+    def equation_count(self) -> int:
+        return 2 if self.type == ConstraintType.DRAGGED else 1
+
+    def add_to(
+        self, solver_system: SolverSystem, workplane: Workplane,
+        point_of: Callable[[Point], Point] = lambda point: point,
+        line_of: Callable[[Link], Line] = lambda link: link.line
+    ) -> None:
+        points = [point_of(point) for point in self.points]
+        lines = [line_of(link) for link in self.links]
+        match self.type:
+            case ConstraintType.DISTANCE:
+                solver_system.distance(*points, self.value, workplane)
+            case ConstraintType.POINT_ON_LINE:
+                solver_system.coincident(*points, *lines, workplane)
+            case ConstraintType.EQUAL:
+                solver_system.equal(*lines, workplane)
+            case ConstraintType.RATIO:
+                solver_system.ratio(*lines, self.value, workplane)
+            case ConstraintType.HORIZONTAL:
+                solver_system.horizontal(*lines, workplane)
+            case ConstraintType.VERTICAL:
+                solver_system.vertical(*lines, workplane)
+            case ConstraintType.ANGLE:
+                solver_system.angle(*lines, self.value, workplane)
+            case ConstraintType.PARALLEL:
+                solver_system.parallel(*lines, workplane)
+            case ConstraintType.DRAGGED:
+                solver_system.dragged(*points, workplane)
@@ -1,9 +1,11 @@
 import math
 import numpy
-from sympy import Expr, Matrix, Symbol, simplify
-from sympy.polys.polytools import resultant
 from type_aliases import Coords
-from typing import TypeVar
+from typing import TYPE_CHECKING, TypeVar
+
+# sympy is only needed for designing curves, so the simulation doesn't have to load it
+if TYPE_CHECKING:
+    from sympy import Expr, Matrix, Symbol
 
 T = TypeVar("T")
 
@@ -26,10 +28,12 @@ def angle_to_coords(radians: float) -> numpy.array:
     return numpy.array([math.cos(radians), math.sin(radians)])
 
 # See https://en.wikipedia.org/wiki/Parametric_equation#Implicitization
-def implicitize(x_coord: Expr, y_coord: Expr, t: Symbol, x: Symbol, y: Symbol) -> Expr:
+def implicitize(x_coord: "Expr", y_coord: "Expr", t: "Symbol", x: "Symbol", y: "Symbol") -> "Expr":
+    from sympy.polys.polytools import resultant
     return resultant(x_coord - x, y_coord - y, t)
 
-def bezier(t: Symbol, *points: list[Coords]) -> Matrix:
+def bezier(t: "Symbol", *points: list[Coords]) -> "Matrix":
+    from sympy import Matrix, simplify
     assert len(points) >= 1, "bezier needs at least one point"
     # See https://en.wikipedia.org/wiki/B%C3%A9zier_curve#Recursive_definition
     def B(vectors: list[Matrix]) -> Matrix:
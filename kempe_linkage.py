@@ -1,32 +1,38 @@
 import math
 import numpy
 import sympy
+from analysis import AnalysisReport
 from helpers import angle_to_coords, coords_to_angle, coords_to_angles, interpolate, normalize
 from itertools import pairwise
-from link import Link
-from linkage import Linkage
+from kempe_runtime import KempeRuntime
+from linkage import gadget
 from options import Options, Visibility
+from pruning import PruningReport, cosine_factor, deviation_estimate, prune_cosines
 from sympy import Expr, Symbol
 from sympy.simplify.fu import TR5, TR8, TR0
 from type_aliases import Coords, Point
+from typing import Optional
 
-class KempeLinkage(Linkage):
-    radius: float
+class KempeLinkage(KempeRuntime):
     options: Options
     alpha: Symbol
     beta: Symbol
     x_axis: Point
-    a: Point
     b: Point
-    pen: Point
-    visible_links: list[Link]
-    alpha_degrees: float
+    # result of the preflight analysis at the end of from_curve
+    analysis: Optional[AnalysisReport]
+    pen_start: Coords
+    # what the prune_tolerance option dropped, None if nothing was dropped
+    pruning: Optional[PruningReport]
 
     def __init__(self, *, radius: float, pen_start: Coords, **options) -> None:
-        super().__init__()
-        self.radius = radius
         self.options = Options(**options)
+        super().__init__(canonicalize_constraints = self.options.canonicalize_constraints)
+        self.radius = radius
+        self.pen_start = pen_start
         self.visible_links = []
+        self.analysis = None
+        self.pruning = None
         self.visibility_stage(Visibility.PEN)
 
         self.x_axis = self.add_pinned_point((self.radius, 0))
@@ -49,16 +55,6 @@ class KempeLinkage(Linkage):
         if self.visibility_stage(Visibility.PEN_PARALLELOGRAM):
             self.visible_links.remove(self.link_points(self.origin, self.x_axis))
 
-    def pen_leg_length(self) -> float:
-        return self.radius / 2
-
-    def pen_leg_coords(self, degrees: float) -> numpy.array:
-        return angle_to_coords(math.radians(degrees)) * self.pen_leg_length()
-
-    def increase_alpha(self, degrees: float) -> None:
-        self.alpha_degrees += degrees
-        self.set_coords(self.a, self.pen_leg_coords(self.alpha_degrees))
-
     def symbolic_pen_coordinates(self) -> tuple[Expr, Expr, Symbol]:
         r = sympy.symbols("r")
         x = (r / 2) * sympy.cos(self.alpha) + (r / 2) * sympy.cos(self.beta)
@@ -82,6 +78,7 @@ class KempeLinkage(Linkage):
             self.visible_links = self.link_map.links[:]
         return is_active
 
+    @gadget
     def make_parallelogram(self, base: Point, a: Point, b: Point, tip: Point) -> None:
         base_a, base_b, a_tip, b_tip = self.link_point_pairs((base, a), (base, b), (a, tip), (b, tip))
         self.equal(base_a, b_tip)
@@ -95,6 +92,7 @@ class KempeLinkage(Linkage):
         self.make_parallelogram(base, a, b, tip)
         return tip
 
+    @gadget
     def make_contra_parallelogram(self, a: Point, b: Point, c: Point, d: Point) -> None:
         ab, bc, cd, da = self.link_point_pairs(*pairwise([a, b, c, d, a]))
         self.equal(ab, cd)
@@ -116,6 +114,7 @@ class KempeLinkage(Linkage):
         self.make_contra_parallelogram(a, b, c, d)
         return d
 
+    @gadget
     def multiply_angle(self, input: Point, base: Point, axis: Point, factor: int) -> Point:
         d = self.contra_paralellelogram(input, base, axis)
         current_input = input
@@ -127,12 +126,14 @@ class KempeLinkage(Linkage):
             d = hinge
         return current_input
 
+    @gadget
     def doubler(self, input: Point, double: Point, base: Point, axis: Point) -> None:
         d = self.contra_paralellelogram(input, base, axis)
         hinge = self.contra_paralellelogram(double, base, input)
         input_d = self.link_points(input, d)
         self.coincident(hinge, input_d)
 
+    @gadget
     def additor(self, a: Point, b: Point, sum: Point, half_sum: Point, base: Point, axis: Point) -> None:
         self.doubler(half_sum, sum, base, axis)
         self.doubler(half_sum, a, base, b)
@@ -142,6 +143,7 @@ class KempeLinkage(Linkage):
         angles = coords_to_angles(*[coords - base_coords for coords in all_coords])
         return angles, base_coords
 
+    @gadget
     def add_angles(self, a: Point, b: Point, base: Point, axis: Point) -> Point:
         a_length, b_length, axis_length = self.get_lengths(a, b, axis, to = base)
         (a_angle, b_angle, axis_angle), base_coords = self.angles_to(a, b, axis, base = base)
@@ -154,6 +156,7 @@ class KempeLinkage(Linkage):
         self.additor(a, b, sum, half_sum, base, axis)
         return sum
 
+    @gadget
     def subtract_angles(self, a: Point, b: Point, base: Point, axis: Point) -> Point:
         a_length, b_length, axis_length = self.get_lengths(a, b, axis, to = base)
         (a_angle, b_angle, axis_angle), base_coords = self.angles_to(a, b, axis, base = base)
@@ -166,6 +169,7 @@ class KempeLinkage(Linkage):
         self.additor(b, difference, a, half_a, base, axis)
         return difference
 
+    @gadget
     def add_constant_angle(self, a: Point, radians: Expr, base: Point) -> Point:
         a_coords, base_coords = self.all_coords(a, base)
         degrees = float(radians * 180 / sympy.pi)
@@ -192,6 +196,7 @@ class KempeLinkage(Linkage):
                 vector = self.add_angles(vector, self.angle_to_vector(angle), base, axis)
         return vector
 
+    @gadget
     def with_length(self, a: Point, length: float, base: Point) -> Point:
         a_coords, base_coords = self.all_coords(a, base)
         point = self.add_point(normalize(a_coords - base_coords) * length + base_coords)
@@ -199,6 +204,7 @@ class KempeLinkage(Linkage):
         self.coincident(a, link)
         return point
 
+    @gadget
     def vector_sum(self, base: Point, *vectors: list[Point]) -> Point:
         while len(vectors) > 0:
             new_base, *translatees = vectors
@@ -235,13 +241,26 @@ class KempeLinkage(Linkage):
             return self.multiply_angle(self.angle_to_vector(angle), self.origin, self.x_axis, factor)
         assert False, "unknown angle type"
 
+    @gadget
     def constrain_to_y_axis(self, point: Point) -> None:
         link = self.link_points(point, self.origin)
         self.vertical(link)
 
     def from_curve(self, expression: Expr, x: Symbol, y: Symbol) -> None:
         # expression = self.move_curve(expression, x, y)
-        expression = self.to_kempe_expression(expression, x, y)
+        kempe_expression = self.to_kempe_expression(expression, x, y)
+        dropped = []
+        if self.options.prune_tolerance > 0:
+            pruned_expression, dropped = prune_cosines(kempe_expression, self.options.prune_tolerance)
+        self.build_from_kempe_expression(pruned_expression if dropped else kempe_expression)
+        if dropped:
+            self.pruning = self.pruning_report(expression, x, y, kempe_expression, dropped)
+        if self.options.preflight_analysis:
+            self.analysis = self.analyze(driver = self.a, around = self.origin, pen = self.pen)
+            if self.options.refuse_hopeless:
+                assert not self.analysis.is_hopeless(), "hopeless linkage\n" + self.analysis.summary()
+
+    def build_from_kempe_expression(self, expression: Expr) -> None:
         vectors = []
         constant_offset, scaled_cosines = expression.as_coeff_add(sympy.cos)
         if constant_offset != 0:
@@ -257,3 +276,65 @@ class KempeLinkage(Linkage):
         lock_onto_y_axis = self.vector_sum(self.origin, *vectors)
         self.constrain_to_y_axis(lock_onto_y_axis)
         self.visibility_stage(Visibility.ALL)
+
+    ### costs as (links, constraints), mirroring the gadgets above, to count what pruning saves without building
+
+    def contra_parallelogram_cost(self) -> numpy.array:
+        # two new sides, the brace adds two links to the crossing joint, an equality and two coincidences
+        brace = int(self.options.brace_contra_parallelograms)
+        return numpy.array([2 + 2 * brace, 2 + 3 * brace])
+
+    def multiply_angle_cost(self, factor: int) -> numpy.array:
+        add_point_between_cost = numpy.array([1, 2])
+        return self.contra_parallelogram_cost() + (factor - 1) * (add_point_between_cost + self.contra_parallelogram_cost())
+
+    def add_angles_cost(self) -> numpy.array:
+        doubler_cost = 2 * self.contra_parallelogram_cost() + numpy.array([0, 1])
+        # two links with lengths to the (half) sum or difference
+        return numpy.array([2, 2]) + 2 * doubler_cost
+
+    def angle_cost(self, angle: Expr) -> numpy.array:
+        if angle == self.alpha or angle == self.beta:
+            return numpy.array([0, 0])
+        if angle.is_Add:
+            def should_sort_to_back(x) -> bool:
+                return x.is_constant() or x.could_extract_minus_sign()
+            angles = sorted(angle.args, key = should_sort_to_back)
+            cost = self.angle_cost(angles[0])
+            for angle in angles[1:]:
+                if angle.is_constant():
+                    cost = cost + numpy.array([2, 2])
+                elif angle.could_extract_minus_sign():
+                    cost = cost + self.add_angles_cost() + self.angle_cost(-angle)
+                else:
+                    cost = cost + self.add_angles_cost() + self.angle_cost(angle)
+            return cost
+        factor, angle = angle.as_coeff_Mul()
+        return self.angle_cost(angle) + self.multiply_angle_cost(int(factor))
+
+    def scaled_cosine_cost(self, scaled_cosine: Expr) -> numpy.array:
+        _, (cosine,) = scaled_cosine.as_coeff_mul(sympy.cos)
+        with_length_cost = numpy.array([1, 2])
+        return self.angle_cost(cosine.args[0]) + with_length_cost
+
+    def vector_sum_cost(self, vector_count: int) -> numpy.array:
+        # every vector is translated onto every later one, using a parallelogram with two new links
+        parallelogram_cost = numpy.array([2, 2 + int(self.options.brace_parallelograms)])
+        return vector_count * (vector_count - 1) // 2 * parallelogram_cost
+
+    def pruning_report(self, expression: Expr, x: Symbol, y: Symbol, kempe_expression: Expr, dropped: list[Expr]) -> PruningReport:
+        # |cos| <= 1, so the dropped terms change the curve's polynomial by at most the sum of their factors
+        max_residual = sum(cosine_factor(scaled_cosine) for scaled_cosine in dropped)
+        constant_offset, scaled_cosines = kempe_expression.as_coeff_add(sympy.cos)
+        full_vector_count = len(scaled_cosines) + int(constant_offset != 0)
+        saved = sum(self.scaled_cosine_cost(scaled_cosine) for scaled_cosine in dropped)
+        saved = saved + self.vector_sum_cost(full_vector_count) - self.vector_sum_cost(full_vector_count - len(dropped))
+        saved_links, saved_constraints = saved
+        return PruningReport(
+            kept_terms = len(scaled_cosines) - len(dropped),
+            dropped_terms = len(dropped),
+            max_residual = max_residual,
+            deviation_near_start = deviation_estimate(max_residual, expression, x, y, self.pen_start),
+            saved_links = int(saved_links),
+            saved_constraints = int(saved_constraints),
+        )
@@ -0,0 +1,60 @@
+import json
+import math
+import numpy
+from helpers import angle_to_coords
+from link import Link
+from linkage import Linkage
+from type_aliases import Point
+
+# everything needed to step a built Kempe linkage, without the sympy based construction
+class KempeRuntime(Linkage):
+    radius: float
+    a: Point
+    pen: Point
+    visible_links: list[Link]
+    alpha_degrees: float
+
+    def pen_leg_length(self) -> float:
+        return self.radius / 2
+
+    def pen_leg_coords(self, degrees: float) -> numpy.array:
+        return angle_to_coords(math.radians(degrees)) * self.pen_leg_length()
+
+    def set_alpha(self, degrees: float) -> None:
+        self.alpha_degrees = degrees
+        self.set_coords(self.a, self.pen_leg_coords(self.alpha_degrees))
+
+    def increase_alpha(self, degrees: float) -> None:
+        self.set_alpha(self.alpha_degrees + degrees)
+
+    def to_json(self) -> dict:
+        data = super().to_json()
+        point_indices = {id(point): index for index, point in enumerate(self.points)}
+        link_indices = {id(link): index for index, link in enumerate(self.link_map.links)}
+        data.update(
+            radius = self.radius,
+            alpha_degrees = self.alpha_degrees,
+            a = point_indices[id(self.a)],
+            pen = point_indices[id(self.pen)],
+            visible_links = [link_indices[id(link)] for link in self.visible_links],
+        )
+        return data
+
+    def load_json(self, data: dict) -> None:
+        super().load_json(data)
+        self.radius = data["radius"]
+        self.alpha_degrees = data["alpha_degrees"]
+        self.a = self.points[data["a"]]
+        self.pen = self.points[data["pen"]]
+        self.visible_links = [self.link_map.links[index] for index in data["visible_links"]]
+
+    @staticmethod
+    def load(path: str, **linkage_options) -> "KempeRuntime":
+        with open(path) as file:
+            data = json.load(file)
+        # solve the way the linkage was built to be solved, unless told otherwise
+        options = {name: data[name] for name in ["canonicalize_constraints"] if name in data}
+        options.update(linkage_options)
+        runtime = KempeRuntime(**options)
+        runtime.load_json(data)
+        return runtime
@@ -1,11 +1,31 @@
+import functools
+import json
 import math
 import numpy
+from analysis import AnalysisReport, analyze
+from canonicalize import Canonicalization, canonicalize
+from cluster import Cluster, single_cluster
+from constraint import Constraint, ConstraintType
 from helpers import interpolate
 from link import Link
 from link_map import LinkMap
 from python_solvespace import SolverSystem
 from slvs_writer import SlvsWriter
 from type_aliases import Coords, Point, Workplane
+from typing import Callable, Optional
+
+def gadget(method: Callable) -> Callable:
+    # attributes the constraints added by the method to a numbered instance of the gadget
+    @functools.wraps(method)
+    def wrapper(self: "Linkage", *args, **kwargs):
+        count = self.gadget_counts.get(method.__name__, 0) + 1
+        self.gadget_counts[method.__name__] = count
+        self.gadget_stack.append(f"{method.__name__} #{count}")
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.gadget_stack.pop()
+    return wrapper
 
 class Linkage:
     solver_system: SolverSystem
@@ -14,21 +34,87 @@ class Linkage:
     points: list[Point]
     link_map: LinkMap
     origin: Point
-
-    def __init__(self) -> None:
+    constraints: list[Constraint]
+    # rewrite equalities and ratios to distances where one length is already enforced
+    canonicalize_constraints: bool
+    # built lazily on the first solve after a constraint was added
+    cluster: Optional[Cluster]
+    canonicalization: Optional[Canonicalization]
+    gadget_stack: list[str]
+    gadget_counts: dict[str, int]
+
+    def __init__(self, *, canonicalize_constraints: bool = False) -> None:
         self.solver_system = SolverSystem()
         self.slvs_writer = SlvsWriter()
         self.workplane = self.solver_system.create_2d_base()
         self.points = []
         self.link_map = LinkMap()
+        self.constraints = []
+        self.canonicalize_constraints = canonicalize_constraints
+        self.cluster = None
+        self.canonicalization = None
+        self.gadget_stack = []
+        self.gadget_counts = {}
         self.origin = self.add_pinned_point((0, 0))
 
+    def build_cluster(self) -> None:
+        self.canonicalization = canonicalize(self.constraints)
+        self.cluster = single_cluster(self.points, self.canonicalization.constraints)
+
     def solve(self) -> int:
-        return self.solver_system.solve()
+        if not self.canonicalize_constraints:
+            return self.solver_system.solve()
+        if self.cluster is None:
+            self.build_cluster()
+        return self.cluster.solve(self.solver_system)
+
+    def analyze(
+        self, driver: Optional[Point] = None, around: Optional[Point] = None, pen: Optional[Point] = None
+    ) -> AnalysisReport:
+        return analyze(self.points, self.constraints, self.coords, driver, around, pen)
 
     def write_slvs(self, path: str) -> None:
         self.slvs_writer.write(path)
 
+    def to_json(self) -> dict:
+        point_indices = {id(point): index for index, point in enumerate(self.points)}
+        link_indices = {id(link): index for index, link in enumerate(self.link_map.links)}
+        return {
+            "canonicalize_constraints": self.canonicalize_constraints,
+            "points": [list(self.coords(point)) for point in self.points],
+            "links": [[point_indices[id(link.a)], point_indices[id(link.b)], link.length] for link in self.link_map.links],
+            "constraints": [
+                {
+                    "type": constraint.type.value,
+                    "points": [point_indices[id(point)] for point in constraint.points],
+                    "links": [link_indices[id(link)] for link in constraint.links],
+                    "value": constraint.value,
+                    "gadget": constraint.gadget,
+                }
+                for constraint in self.constraints
+            ],
+        }
+
+    def load_json(self, data: dict) -> None:
+        # replays a linkage into this freshly created one, skipping what __init__ already added
+        for coords in data["points"][len(self.points):]:
+            self.add_point(coords)
+        for a, b, length in data["links"]:
+            self.link_points(self.points[a], self.points[b]).length = length
+        links = self.link_map.links
+        for constraint in data["constraints"][len(self.constraints):]:
+            self.add_constraint(Constraint(
+                ConstraintType(constraint["type"]),
+                points = [self.points[index] for index in constraint["points"]],
+                links = [links[index] for index in constraint["links"]],
+                value = constraint["value"],
+                gadget = constraint["gadget"],
+            ))
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_json(), file)
+
     def coords(self, point: Point) -> numpy.array:
         return numpy.array(self.solver_system.params(point.params))
 
@@ -68,6 +154,7 @@ class Linkage:
     def link_point_pairs(self, *point_pairs: list[tuple[Point, Point]]) -> list[Link]:
         return [self.link_points(a, b) for a, b in point_pairs]
 
+    @gadget
     def add_point_between(self, a: Point, b: Point, ratio: float) -> Point:
         point = self.add_point(interpolate(self.coords(a), self.coords(b), ratio))
         long_link, short_link = self.link_point_pairs((a, b), (a, point))
@@ -88,24 +175,33 @@ class Linkage:
 
     ### constraints
 
+    def add_constraint(self, constraint: Constraint) -> None:
+        if self.gadget_stack:
+            constraint.gadget = " > ".join(self.gadget_stack)
+        self.constraints.append(constraint)
+        self.cluster = None
+        constraint.add_to(self.solver_system, self.workplane)
+        self.slvs_writer.add_constraint(
+            type = constraint.type.value,
+            value = constraint.value,
+            points = constraint.points,
+            lines = [link.line for link in constraint.links]
+        )
+
     def pin_point(self, point: Point) -> None:
-        self.solver_system.dragged(point, self.workplane)
-        self.slvs_writer.add_constraint(type = 200, points = [point])
+        self.add_constraint(Constraint(ConstraintType.DRAGGED, points = [point]))
 
     def length(self, link: Link, length: float) -> None:
         assert not link.has_length(), "already has a length"
         length = math.fabs(length)
         link.length = length
-        self.solver_system.distance(link.a, link.b, length, self.workplane)
-        self.slvs_writer.add_constraint(type = 30, value = length, points = [link.a, link.b])
+        self.add_constraint(Constraint(ConstraintType.DISTANCE, points = [link.a, link.b], value = length))
 
     def angle(self, a: Link, b: Link, degrees: float) -> None:
-        self.solver_system.angle(a.line, b.line, degrees, self.workplane)
-        self.slvs_writer.add_constraint(type = 120, value = degrees, lines = [a.line, b.line])
+        self.add_constraint(Constraint(ConstraintType.ANGLE, links = [a, b], value = degrees))
 
     def coincident(self, point: Point, link: Link) -> None:
-        self.solver_system.coincident(point, link.line, self.workplane)
-        self.slvs_writer.add_constraint(type = 42, points = [point], lines = [link.line])
+        self.add_constraint(Constraint(ConstraintType.POINT_ON_LINE, points = [point], links = [link]))
 
     def assert_proper_length_constraint(self, a: Link, b: Link, unconstrained_ok = False) -> None:
         if unconstrained_ok and not a.has_length() and not b.has_length():
@@ -118,8 +214,7 @@ class Linkage:
             a.length = b.length
         if a.has_length():
             b.length = a.length
-        self.solver_system.equal(a.line, b.line, self.workplane)
-        self.slvs_writer.add_constraint(type = 50, lines = [a.line, b.line])
+        self.add_constraint(Constraint(ConstraintType.EQUAL, links = [a, b]))
 
     def ratio(self, a: Link, b: Link, ratio: float) -> None:
         self.assert_proper_length_constraint(a, b)
@@ -127,17 +222,13 @@ class Linkage:
             a.length = b.length * ratio
         if a.has_length():
             b.length = a.length / ratio
-        self.solver_system.ratio(a.line, b.line, ratio, self.workplane)
-        self.slvs_writer.add_constraint(type = 51, value = ratio, lines = [a.line, b.line])
+        self.add_constraint(Constraint(ConstraintType.RATIO, links = [a, b], value = ratio))
 
     def parallel(self, a: Link, b: Link) -> None:
-        self.solver_system.parallel(a.line, b.line, self.workplane)
-        self.slvs_writer.add_constraint(type = 121, lines = [a.line, b.line])
+        self.add_constraint(Constraint(ConstraintType.PARALLEL, links = [a, b]))
 
     def horizontal(self, link: Link) -> None:
-        self.solver_system.horizontal(link.line, self.workplane)
-        self.slvs_writer.add_constraint(type = 80, lines = [link.line])
+        self.add_constraint(Constraint(ConstraintType.HORIZONTAL, links = [link]))
 
     def vertical(self, link: Link) -> None:
-        self.solver_system.vertical(link.line, self.workplane)
-        self.slvs_writer.add_constraint(type = 81, lines = [link.line])
+        self.add_constraint(Constraint(ConstraintType.VERTICAL, links = [link]))
@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import json
+import math
+import numpy
+import re
+import socket
+import struct
+from analysis import residuals
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from constraint import ConstraintType
+from kempe_runtime import KempeRuntime
+from typing import TYPE_CHECKING, Hashable, Optional
+
+if TYPE_CHECKING:
+    from sympy import Expr, Symbol
+
+# Wire format, in both directions every message is a frame of a little endian
+# uint32 length followed by that many bytes. Requests are UTF-8 JSON objects, e. g.
+#   {"curve": "x - y + 0.2", "radius": 4, "pen_start": [2, 2.2], "options": {},
+#    "op": "positions", "start": 0, "stop": 90, "step": 1}
+#   {..., "op": "joints", "alpha": 45}
+# Responses start with a header of status (uint8), rows and columns (uint32 each).
+# On success, rows * columns little endian float64 values follow, on error a UTF-8 message.
+# "positions" answers with one row of alpha, pen x, pen y and the largest constraint residual
+# per step, a position is only valid if the residual is below RESIDUAL_TOLERANCE. "joints"
+# answers with one row of x and y per joint. Curves may only use numbers, x, y, +, -, *, /,
+# parentheses and powers of x, y or a number with a small integer exponent.
+# Requests are served by worker processes, each owning a shard of the linkage pool.
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<BII")
+OK = 0
+ERROR = 1
+OPS = ["positions", "joints"]
+# largest change of alpha per solve, larger jumps could make the linkage flip into another configuration
+MAX_STEP = 1.0
+# joints are only reported when no constraint is violated by more than this
+RESIDUAL_TOLERANCE = 1e-6
+# one token each, matched at increasing positions, so checking a curve takes linear time
+TOKEN = re.compile(r"\s*(?:(?P<number>\d+(?:\.\d*)?|\.\d+)|(?P<symbol>[xy])|(?P<power>\*\*)|(?P<operator>[-+*/()]))")
+MAX_CURVE_LENGTH = 1000
+MAX_EXPONENT = 16
+
+def encode_array(array: numpy.array) -> bytes:
+    rows, columns = array.shape
+    return HEADER.pack(OK, rows, columns) + array.astype("<f8").tobytes()
+
+def encode_error(message: str) -> bytes:
+    return HEADER.pack(ERROR, 0, 0) + message.encode()
+
+def decode_response(payload: bytes) -> numpy.array:
+    status, rows, columns = HEADER.unpack_from(payload)
+    body = payload[HEADER.size:]
+    if status != OK:
+        raise RuntimeError(body.decode())
+    return numpy.frombuffer(body, dtype = "<f8").reshape(rows, columns)
+
+def linkage_key(request: dict) -> Hashable:
+    options = tuple(sorted(request.get("options", {}).items()))
+    return request["curve"], float(request["radius"]), tuple(request["pen_start"]), options
+
+def check_curve(curve: str) -> None:
+    # sympy evaluates the text as Python, so no names or attributes may get that far, and
+    # powers are limited so that evaluating them exactly stays cheap (e. g. 9**9**9)
+    assert len(curve) <= MAX_CURVE_LENGTH, f"curves may have at most {MAX_CURVE_LENGTH} characters"
+    position = 0
+    previous = None
+    while curve[position:].strip():
+        token = TOKEN.match(curve, position)
+        assert token, f"unexpected character at {position}, curves may only contain numbers, x, y, +, -, *, /, ** and parentheses"
+        if previous is not None and previous.lastgroup == "power":
+            exponent = token.group("number")
+            assert exponent and exponent.isdigit() and int(exponent) <= MAX_EXPONENT, f"exponents must be integers up to {MAX_EXPONENT}"
+        if token.lastgroup == "power":
+            assert previous is not None and previous.lastgroup in ["number", "symbol"], "only numbers, x and y can be raised to a power"
+            before_base = curve[:previous.start()].rstrip()
+            assert not before_base.endswith("**"), "powers can't be chained"
+        position = token.end()
+        previous = token
+    assert previous is None or previous.lastgroup != "power", "missing exponent"
+
+def parse_curve(curve: str, x: "Symbol", y: "Symbol") -> "Expr":
+    check_curve(curve)
+    import sympy
+    from sympy.parsing.sympy_parser import parse_expr, standard_transformations
+    global_dict = {
+        "__builtins__": {},
+        "Float": sympy.Float,
+        "Integer": sympy.Integer,
+        "Rational": sympy.Rational,
+        "Symbol": sympy.Symbol,
+    }
+    return parse_expr(curve, local_dict = {"x": x, "y": y}, global_dict = global_dict, transformations = standard_transformations)
+
+def build_linkage(request: dict) -> KempeRuntime:
+    # construction needs sympy, which is only loaded once the first linkage is built
+    import sympy
+    from kempe_linkage import KempeLinkage
+    from options import Visibility
+    options = dict(request.get("options", {}))
+    if "visible" in options:
+        options["visible"] = Visibility[options["visible"]]
+    x, y = sympy.symbols("x y", real = True)
+    curve = parse_curve(request["curve"], x, y)
+    linkage = KempeLinkage(radius = request["radius"], pen_start = tuple(request["pen_start"]), **options)
+    linkage.from_curve(curve, x, y)
+    return linkage
+
+def max_residual(linkage: KempeRuntime) -> float:
+    # solvespace reports braced linkages as inconsistent even when solved, so the constraints are checked directly
+    return max((
+        math.fabs(value)
+        for constraint in linkage.constraints if constraint.type != ConstraintType.DRAGGED
+        for value in residuals(constraint, linkage.coords)
+    ), default = 0)
+
+class PooledLinkage:
+    request: dict
+    linkage: Optional[KempeRuntime]
+
+    def __init__(self, request: dict) -> None:
+        self.request = request
+        self.linkage = None
+
+    def move_to(self, alpha: float) -> int:
+        # approaches alpha in small steps from the current, warm configuration
+        while math.fabs(alpha - self.linkage.alpha_degrees) > MAX_STEP:
+            self.linkage.increase_alpha(math.copysign(MAX_STEP, alpha - self.linkage.alpha_degrees))
+            self.linkage.solve()
+        self.linkage.set_alpha(alpha)
+        return self.linkage.solve()
+
+    def positions(self, start: float, stop: float, step: float) -> numpy.array:
+        assert step > 0, "step needs to be positive"
+        rows = []
+        for alpha in numpy.arange(start, stop + step / 2, step):
+            self.move_to(float(alpha))
+            x, y = self.linkage.coords(self.linkage.pen)
+            rows.append([alpha, x, y, max_residual(self.linkage)])
+        return numpy.array(rows).reshape(-1, 4)
+
+    def joints(self, alpha: float) -> numpy.array:
+        result = self.move_to(alpha)
+        residual = max_residual(self.linkage)
+        assert residual < RESIDUAL_TOLERANCE, f"constraints violated by {residual:g} (solver result {result})"
+        return numpy.array(self.linkage.all_coords(*self.linkage.points)).reshape(-1, 2)
+
+    def answer(self, request: dict) -> numpy.array:
+        if self.linkage is None:
+            self.linkage = build_linkage(self.request)
+        match request["op"]:
+            case "positions":
+                return self.positions(float(request["start"]), float(request["stop"]), float(request["step"]))
+            case "joints":
+                return self.joints(float(request["alpha"]))
+
+class LRU:
+    entries: OrderedDict
+    capacity: int
+
+    def __init__(self, capacity: int) -> None:
+        self.entries = OrderedDict()
+        self.capacity = capacity
+
+    def get(self, key: Hashable) -> Optional[object]:
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: object) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last = False)
+
+# the shard of the linkage pool owned by this worker process, set up by init_worker
+worker_linkages: Optional[LRU] = None
+
+def init_worker(pool_size: int) -> None:
+    global worker_linkages
+    worker_linkages = LRU(pool_size)
+
+def answer_in_worker(request: dict) -> bytes:
+    try:
+        key = linkage_key(request)
+        pooled = worker_linkages.get(key)
+        if pooled is None:
+            pooled = PooledLinkage(request)
+            worker_linkages.put(key, pooled)
+        return encode_array(pooled.answer(request))
+    except Exception as error:
+        return encode_error(f"{type(error).__name__}: {error}")
+
+class LinkageService:
+    results: LRU
+    # python_solvespace holds the GIL while solving, so every worker is a process
+    # that owns the linkages whose keys hash to it
+    shards: list[ProcessPoolExecutor]
+
+    def __init__(self, *, pool_size: int, cache_size: int, workers: int) -> None:
+        self.results = LRU(cache_size)
+        shard_pool_size = max(1, pool_size // workers)
+        self.shards = [
+            ProcessPoolExecutor(max_workers = 1, initializer = init_worker, initargs = (shard_pool_size,))
+            for _ in range(workers)
+        ]
+
+    async def respond(self, payload: bytes) -> bytes:
+        try:
+            request = json.loads(payload)
+            assert request.get("op") in OPS, "unknown op " + str(request.get("op"))
+            key = linkage_key(request)
+            parameters = tuple(sorted((name, value) for name, value in request.items() if name in ["op", "start", "stop", "step", "alpha"]))
+            result_key = (key, parameters)
+        except Exception as error:
+            return encode_error(f"{type(error).__name__}: {error}")
+        response = self.results.get(result_key)
+        if response is None:
+            shard = self.shards[hash(key) % len(self.shards)]
+            response = await asyncio.get_running_loop().run_in_executor(shard, answer_in_worker, request)
+            if response[0] == OK:
+                self.results.put(result_key, response)
+        return response
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                payload = await reader.readexactly(length)
+                response = await self.respond(payload)
+                writer.write(LENGTH.pack(len(response)) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path: str) -> None:
+        server = await asyncio.start_unix_server(self.handle_client, path)
+        async with server:
+            await server.serve_forever()
+
+def receive_exactly(connection: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        assert chunk, "connection closed by the service"
+        data += chunk
+    return data
+
+def request(path: str, message: dict) -> numpy.array:
+    # minimal synchronous client
+    payload = json.dumps(message).encode()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        connection.sendall(LENGTH.pack(len(payload)) + payload)
+        (length,) = LENGTH.unpack(receive_exactly(connection, LENGTH.size))
+        return decode_response(receive_exactly(connection, length))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "serve pen and joint positions of resident Kempe linkages")
+    parser.add_argument("--socket", default = "/tmp/kempe-linkages.sock", help = "path of the unix domain socket")
+    parser.add_argument("--pool-size", type = int, default = 8, help = "number of linkages kept resident, split among the workers")
+    parser.add_argument("--cache-size", type = int, default = 1024, help = "number of cached responses")
+    parser.add_argument("--workers", type = int, default = 4, help = "number of solver processes")
+    arguments = parser.parse_args()
+    service = LinkageService(pool_size = arguments.pool_size, cache_size = arguments.cache_size, workers = arguments.workers)
+    asyncio.run(service.serve(arguments.socket))
+
+if __name__ == "__main__":
+    main()
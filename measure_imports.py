@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+# measures import time and resident memory of each entry point in a fresh interpreter,
+# visualization imports matplotlib lazily, so pyplot is imported as animate would
+ENTRY_POINTS = {
+    "runtime": ["kempe_runtime"],
+    "visualization": ["visualization", "matplotlib.pyplot"],
+    "construction": ["kempe_linkage"],
+}
+HEAVY_MODULES = ["numpy", "python_solvespace", "sympy", "matplotlib"]
+
+MEASUREMENT = """
+import resource, sys, time
+start = time.perf_counter()
+{imports}
+duration = time.perf_counter() - start
+# ru_maxrss is given in kilobytes on Linux
+memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+loaded = [name for name in {heavy_modules!r} if name in sys.modules]
+print(f"{{duration * 1000:.0f}} ms, {{memory:.1f}} MiB, loads {{', '.join(loaded) or 'nothing heavy'}}")
+"""
+
+def measure(modules: list[str]) -> str:
+    imports = "\n".join(f"import {module}" for module in modules)
+    code = MEASUREMENT.format(imports = imports, heavy_modules = HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], capture_output = True, text = True)
+    if result.returncode != 0:
+        return "failed: " + result.stderr.strip().splitlines()[-1]
+    return result.stdout.strip()
+
+def main() -> None:
+    for name, modules in ENTRY_POINTS.items():
+        print(f"{name} ({', '.join(modules)}): {measure(modules)}")
+
+if __name__ == "__main__":
+    main()
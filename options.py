@@ -14,3 +14,11 @@ class Options:
     brace_parallelograms: bool = True
     brace_contra_parallelograms: bool = True
     visible: Visibility = Visibility.COSINES
+    # rewrite relations between links of known length to distances, one for one
+    canonicalize_constraints: bool = False
+    # analyse the degrees of freedom and redundant constraints at the end of from_curve
+    preflight_analysis: bool = True
+    # fail in from_curve for linkages that can't move or whose pen isn't determined
+    refuse_hopeless: bool = True
+    # drop cosine terms whose factor is below this fraction of the largest factor, 0 keeps all terms
+    prune_tolerance: float = 0
@@ -0,0 +1,45 @@
+import math
+import sympy
+from dataclasses import dataclass
+from sympy import Expr
+
+@dataclass
+class PruningReport:
+    kept_terms: int
+    dropped_terms: int
+    # bound on the value of the curve's polynomial at the pen, i. e. on how far the traced curve is off
+    max_residual: float
+    # first order estimate of the pen's distance to the curve near pen_start, using the gradient there,
+    # not a bound: where the gradient is smaller along the curve, the pen deviates further
+    deviation_near_start: float
+    saved_links: int = 0
+    saved_constraints: int = 0
+
+    def summary(self) -> str:
+        return "\n".join([
+            f"dropped {self.dropped_terms} of {self.kept_terms + self.dropped_terms} cosine terms",
+            f"residual of the curve at the pen: at most {self.max_residual:g}",
+            f"pen deviation near the start (first order estimate, not a bound): about {self.deviation_near_start:g}",
+            f"saved links: {self.saved_links}, saved constraints: {self.saved_constraints}",
+        ])
+
+def cosine_factor(scaled_cosine: Expr) -> float:
+    factor, _ = scaled_cosine.as_coeff_mul(sympy.cos)
+    return math.fabs(float(factor))
+
+def prune_cosines(expression: Expr, tolerance: float) -> tuple[Expr, list[Expr]]:
+    # drops the scaled cosines whose factor is below tolerance times the largest factor
+    _, scaled_cosines = expression.as_coeff_add(sympy.cos)
+    if len(scaled_cosines) == 0:
+        return expression, []
+    largest = max(cosine_factor(scaled_cosine) for scaled_cosine in scaled_cosines)
+    dropped = [scaled_cosine for scaled_cosine in scaled_cosines if cosine_factor(scaled_cosine) < tolerance * largest]
+    return expression - sympy.Add(*dropped), dropped
+
+def deviation_estimate(residual: float, expression: Expr, x: sympy.Symbol, y: sympy.Symbol, point: tuple[float, float]) -> float:
+    substitutions = {x: point[0], y: point[1]}
+    gradient = [float(sympy.diff(expression, symbol).subs(substitutions)) for symbol in [x, y]]
+    gradient_length = math.hypot(*gradient)
+    if gradient_length == 0:
+        return math.inf
+    return residual / gradient_length
@@ -0,0 +1,24 @@
+import argparse
+from kempe_runtime import KempeRuntime
+
+# steps a linkage saved with Linkage.save, without loading sympy
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "simulate a prebuilt Kempe linkage")
+    parser.add_argument("path", help = "linkage saved with Linkage.save")
+    parser.add_argument("--steps", type = int, default = 360)
+    parser.add_argument("--degrees", type = float, default = 1, help = "increase of alpha per step")
+    parser.add_argument("--plot", action = "store_true", help = "animate the linkage instead of printing the pen positions")
+    arguments = parser.parse_args()
+    linkage = KempeRuntime.load(arguments.path)
+    if arguments.plot:
+        from visualization import animate
+        animate(linkage, arguments.degrees)
+        return
+    for _ in range(arguments.steps):
+        linkage.increase_alpha(arguments.degrees)
+        result = linkage.solve()
+        x, y = linkage.coords(linkage.pen)
+        print(result, linkage.alpha_degrees, x, y)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from kempe_runtime import KempeRuntime
+
+def animate(linkage: KempeRuntime, degrees_per_frame: float = 1) -> None:
+    # matplotlib (and its Qt backend) is only loaded once something is shown
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+    pen_trace_xs, pen_trace_ys = [], []
+
+    def animate_frame(_) -> None:
+        linkage.increase_alpha(degrees_per_frame)
+        result = linkage.solve()
+        print(result, linkage.alpha_degrees)
+        x, y = linkage.coords(linkage.pen)
+        pen_trace_xs.append(x)
+        pen_trace_ys.append(y)
+
+        link_lines = []
+        for link in linkage.visible_links:
+            (x1, y1), (x2, y2) = linkage.all_coords(link.a, link.b)
+            link_lines.extend([[x1, x2], [y1, y2]])
+
+        plt.delaxes()
+        plt.axis("equal")
+        plt.plot(x, y, marker = "o")
+        plt.plot(*link_lines)
+        plt.plot(pen_trace_xs, pen_trace_ys)
+
+    figure = plt.figure()
+    _animation = FuncAnimation(figure, animate_frame, interval = 10)
+    plt.show()